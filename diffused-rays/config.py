@@ -1,13 +1,21 @@
 """Configuration constants for diffused-rays."""
 
 import math
+import os
 
-# Display settings
-RENDER_WIDTH = 256
-RENDER_HEIGHT = 256
-DISPLAY_WIDTH = 800
-DISPLAY_HEIGHT = 800
-FPS_CAP = 60
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, or use the default."""
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+# Display settings (override at launch, e.g. DIFFUSED_RAYS_RENDER_WIDTH=128)
+RENDER_WIDTH = _env_int("DIFFUSED_RAYS_RENDER_WIDTH", 256)
+RENDER_HEIGHT = _env_int("DIFFUSED_RAYS_RENDER_HEIGHT", 256)
+DISPLAY_WIDTH = _env_int("DIFFUSED_RAYS_DISPLAY_WIDTH", 800)
+DISPLAY_HEIGHT = _env_int("DIFFUSED_RAYS_DISPLAY_HEIGHT", 800)
+FPS_CAP = _env_int("DIFFUSED_RAYS_FPS_CAP", 60)
 
 # Player settings
 MOVE_SPEED = 3.0  # units per second
@@ -16,6 +24,8 @@ FOV = math.radians(60)  # 60 degrees field of view
 
 # Raycaster settings
 MAX_DEPTH = 25.0  # maximum ray distance (increased for larger map)
+ASYNC_RAYCAST = True  # render raw/texture views on a worker thread (one frame of latency)
+USE_GPU = False  # run the ray march on CUDA via CuPy (pays off at large render widths)
 
 # Wall colors (RGB) - vibrant base colors before distance shading
 WALL_COLORS = {
@@ -42,6 +52,13 @@ CEILING_COLOR = (20, 20, 30)
 SD_MODEL = "stabilityai/sd-turbo"
 SD_PROMPT = "dark medieval dungeon, burning torches on walls, flickering firelight, warm orange glow, ancient stone corridors, shadows dancing, atmospheric"
 SD_NEGATIVE_PROMPT = ""
-SD_NUM_STEPS = 2  # 2 steps minimum for img2img on MPS (1 step causes errors)
+SD_NUM_STEPS = None  # None = one denoising step at any strength (img2img runs int(steps * strength))
 SD_STRENGTH = 0.5  # How much to transform (0.3-0.6 for img2img)
-SD_GUIDANCE_SCALE = 0.0  # Required for SD Turbo
+SD_GUIDANCE_SCALE = 0.0  # Required for SD Turbo (<= 1.0 skips the unconditional UNet pass)
+SD_DTYPE = "auto"  # "auto" (bfloat16 on Ampere+ CUDA, else float16), "float16" or "bfloat16"
+SD_COMPILE = True  # torch.compile the UNet on CUDA (slow first load, faster frames)
+# Reuse the last SD frame if the input's 16x16 block means differ by at most
+# this on average. This freezes the SD output (no fresh noise) while the view
+# is unchanged, e.g. when standing still. None = always restylize.
+SD_REUSE_THRESHOLD = 0.0
+SD_FAST_RAYCAST = True  # Flat-shaded raycaster input while the SD view hides the raw frame
@@ -1,42 +1,73 @@
 """Game state management: Player and Map classes."""
 
 import math
-from dataclasses import dataclass
 from typing import List
 
+import numpy as np
+
 import config
+from raycaster_kernels import try_move_ok
+
+# Binary angles (BAMS): a full turn is 2^16 units, so wrapping is a mask
+_BAM_BITS = 16
+_BAM_MASK = (1 << _BAM_BITS) - 1
+_RAD_TO_BAM = (1 << _BAM_BITS) / (2 * math.pi)
+_BAM_TO_RAD = (2 * math.pi) / (1 << _BAM_BITS)
+
+# Interleaved (cos, sin) lookup table indexed by the top bits of a binary angle
+_LUT_BITS = 12
+_LUT_SHIFT = _BAM_BITS - _LUT_BITS
+_COS_SIN = [
+    (math.cos(i * 2 * math.pi / (1 << _LUT_BITS)), math.sin(i * 2 * math.pi / (1 << _LUT_BITS)))
+    for i in range(1 << _LUT_BITS)
+]
 
 
-@dataclass
 class Player:
     """Player state with position and viewing angle."""
-    x: float
-    y: float
-    angle: float  # in radians, 0 = facing +X (east)
+
+    def __init__(self, x: float, y: float, angle: float):
+        """Initialize player at (x, y) facing angle radians."""
+        self.x = x
+        self.y = y
+        self.angle_bam = 0  # viewing angle as a binary angle
+        self.angle = angle
+
+    def __repr__(self) -> str:
+        return f"Player(x={self.x!r}, y={self.y!r}, angle={self.angle!r})"
+
+    @property
+    def angle(self) -> float:
+        """Viewing angle in radians, 0 = facing +X (east)."""
+        return self.angle_bam * _BAM_TO_RAD
+
+    @angle.setter
+    def angle(self, value: float) -> None:
+        # angle_bam is the only stored angle, so the two can't drift apart
+        self.angle_bam = round(value * _RAD_TO_BAM) & _BAM_MASK
 
     def move_forward(self, distance: float, game_map: 'Map') -> None:
         """Move player forward in facing direction."""
-        new_x = self.x + math.cos(self.angle) * distance
-        new_y = self.y + math.sin(self.angle) * distance
+        cos_a, sin_a = _COS_SIN[self.angle_bam >> _LUT_SHIFT]
+        new_x = self.x + cos_a * distance
+        new_y = self.y + sin_a * distance
         self._try_move(new_x, new_y, game_map)
 
     def move_backward(self, distance: float, game_map: 'Map') -> None:
         """Move player backward from facing direction."""
-        new_x = self.x - math.cos(self.angle) * distance
-        new_y = self.y - math.sin(self.angle) * distance
+        cos_a, sin_a = _COS_SIN[self.angle_bam >> _LUT_SHIFT]
+        new_x = self.x - cos_a * distance
+        new_y = self.y - sin_a * distance
         self._try_move(new_x, new_y, game_map)
 
     def turn_left(self, angle: float) -> None:
         """Turn player left by given angle in radians."""
-        self.angle -= angle
-        # Keep angle in [0, 2*pi) range
-        self.angle = self.angle % (2 * math.pi)
+        # Masking keeps the angle in [0, 2*pi)
+        self.angle_bam = (self.angle_bam - round(angle * _RAD_TO_BAM)) & _BAM_MASK
 
     def turn_right(self, angle: float) -> None:
         """Turn player right by given angle in radians."""
-        self.angle += angle
-        # Keep angle in [0, 2*pi) range
-        self.angle = self.angle % (2 * math.pi)
+        self.angle_bam = (self.angle_bam + round(angle * _RAD_TO_BAM)) & _BAM_MASK
 
     def _try_move(self, new_x: float, new_y: float, game_map: 'Map') -> None:
         """Attempt to move to new position with collision detection."""
@@ -44,22 +75,13 @@ class Player:
         # Check with a small margin to prevent getting too close to walls
         margin = 0.2
 
-        # Try X movement first
-        if not game_map.is_wall(new_x, self.y):
-            # Also check corners
-            if (not game_map.is_wall(new_x + margin, self.y + margin) and
-                not game_map.is_wall(new_x + margin, self.y - margin) and
-                not game_map.is_wall(new_x - margin, self.y + margin) and
-                not game_map.is_wall(new_x - margin, self.y - margin)):
-                self.x = new_x
+        # Try X movement first (center + corners checked in one compiled call)
+        if try_move_ok(game_map.flat, game_map.stride, new_x, self.y, margin):
+            self.x = new_x
 
         # Try Y movement
-        if not game_map.is_wall(self.x, new_y):
-            if (not game_map.is_wall(self.x + margin, new_y + margin) and
-                not game_map.is_wall(self.x + margin, new_y - margin) and
-                not game_map.is_wall(self.x - margin, new_y + margin) and
-                not game_map.is_wall(self.x - margin, new_y - margin)):
-                self.y = new_y
+        if try_move_ok(game_map.flat, game_map.stride, self.x, new_y, margin):
+            self.y = new_y
 
 
 class Map:
@@ -67,18 +89,13 @@ class Map:
 
     def __init__(self, grid: List[List[int]]):
         """Initialize map from 2D grid."""
-        self.grid = grid
         self.height = len(grid)
         self.width = len(grid[0]) if self.height > 0 else 0
-
-    def get_cell(self, x: int, y: int) -> int:
-        """Get the value at grid position (x, y). Returns 1 if out of bounds."""
-        if 0 <= x < self.width and 0 <= y < self.height:
-            return self.grid[y][x]
-        return 1  # Treat out-of-bounds as wall
-
-    def is_wall(self, x: float, y: float) -> bool:
-        """Check if world position (x, y) is inside a wall."""
-        grid_x = int(x)
-        grid_y = int(y)
-        return self.get_cell(grid_x, grid_y) != 0
+        # Wall-padded copy with a sentinel wall on every side, so rays and
+        # collision probes can't leave the array and need no bounds checks.
+        # Cell (x, y) is padded[y + 1, x + 1].
+        self.padded = np.pad(np.asarray(grid, dtype=np.int8), 1, constant_values=1)
+        self.grid = self.padded[1:-1, 1:-1]
+        # Row-major flat view: cell (x, y) is flat[(y + 1) * stride + x + 1]
+        self.stride = self.width + 2
+        self.flat = self.padded.ravel()
@@ -2,37 +2,115 @@
 
 import sys
 import time
+from functools import lru_cache
+
 import pygame
 import numpy as np
 
 import config
 from game_state import Player, Map
-from raycaster import cast_rays
+from raycaster import cast_rays, RaycasterWorker
 from maps.test_map import MAP, PLAYER_START_X, PLAYER_START_Y, PLAYER_START_ANGLE
 
 
+@lru_cache(maxsize=128)
+def render_text(font, text, color):
+    """Render text with a font, reusing the surface if it was rendered recently."""
+    return font.render(text, True, color)
+
+
+class CounterLabel:
+    """Text label for a changing value, re-rendered only when its text changes."""
+
+    def __init__(self, font, color):
+        self.font = font
+        self.color = color
+        self.text = None
+        self.surface = None
+
+    def render(self, text):
+        """Return the label surface for text, rendering it only if it changed."""
+        if text != self.text:
+            self.surface = self.font.render(text, True, self.color)
+            self.text = text
+        return self.surface
+
+
 def main():
     """Main game loop."""
     # Initialize pygame
     pygame.init()
     screen = pygame.display.set_mode((config.DISPLAY_WIDTH, config.DISPLAY_HEIGHT))
     pygame.display.set_caption("Diffused Rays")
+
+    # Only queue the events the loop handles (mouse motion etc. never pile up);
+    # held keys are read from the keyboard state, which SDL updates regardless
+    pygame.event.set_blocked(None)
+    pygame.event.set_allowed([pygame.QUIT, pygame.KEYDOWN])
     clock = pygame.time.Clock()
 
+    # Persistent render-resolution surface in the window's pixel format, so
+    # frames can be scaled directly into the window surface
+    render_surface = pygame.Surface((config.RENDER_WIDTH, config.RENDER_HEIGHT)).convert()
+    display_size = (config.DISPLAY_WIDTH, config.DISPLAY_HEIGHT)
+
+    # Raycaster output is a (W, H, 3) view of the render surface's pixels, so
+    # raw frames need no copy into the surface
+    frame_buf = pygame.surfarray.pixels3d(render_surface)
+
+    # In SD view mode the render surface receives SD output, so raw frames go to
+    # two ping-pong buffers handed to the stylizer without a copy. The raycaster
+    # always writes the buffer that was not submitted last.
+    sd_raw_bufs = [
+        np.empty((config.RENDER_WIDTH, config.RENDER_HEIGHT, 3), dtype=np.uint8)
+        for _ in range(2)
+    ]
+    sd_raw_frame = None  # buffer holding the latest raw frame
+    sd_raw_state = None  # player state it was rendered from
+    sd_submitted = None  # buffer submitted to the stylizer last
+
+    # Float32 scratch for partial raw/SD blends
+    blend_buf = np.empty((config.RENDER_WIDTH, config.RENDER_HEIGHT, 3), dtype=np.float32)
+    blend_tmp = np.empty_like(blend_buf)
+
     # Initialize game state
     player = Player(PLAYER_START_X, PLAYER_START_Y, PLAYER_START_ANGLE)
     game_map = Map(MAP)
 
+    # Background ray caster for the raw and texture views (SD view renders
+    # inline, its frames are handed to the stylizer)
+    # It renders straight into the pixels of its own surfaces, which are then
+    # scaled to the window like the render surface (no copy)
+    raycaster_worker = None
+    worker_surfaces = []
+    worker_buffers = []
+    if config.ASYNC_RAYCAST:
+        worker_surfaces = [
+            pygame.Surface((config.RENDER_WIDTH, config.RENDER_HEIGHT)).convert()
+            for _ in range(3)
+        ]
+        worker_buffers = [pygame.surfarray.pixels3d(surf) for surf in worker_surfaces]
+        raycaster_worker = RaycasterWorker(game_map, worker_buffers)
+        raycaster_worker.start()
+
     # Font for UI
     font = pygame.font.Font(None, 36)
     small_font = pygame.font.Font(None, 24)
 
+    # FPS counters (display FPS is sampled every 250ms so the label settles)
+    display_fps_label = CounterLabel(font, (255, 255, 255))
+    sd_fps_label = CounterLabel(font, (0, 255, 0))
+    tex_fps_label = CounterLabel(font, (100, 200, 255))
+    controls_text = small_font.render("WASD/Arrows: Move | ESC: Quit", True, (200, 200, 200))
+    display_fps = 0.0
+    display_fps_last_time = 0.0
+
     # SD stylizer state
     sd_enabled = False
     async_stylizer = None
     sd_fps = 0.0
     sd_frame_count = 0
-    sd_last_time = time.time()
+    sd_last_time = time.perf_counter()
     sd_blend = 1.0  # Blend factor: 0.0 = raw, 1.0 = full SD
 
     # Texture mode state
@@ -41,7 +119,7 @@ def main():
     texture_stylizer = None
     tex_fps = 0.0
     tex_frame_count = 0
-    tex_last_time = time.time()
+    tex_last_time = time.perf_counter()
     tex_last_submit = 0.0  # Throttle submissions
 
     # Visual styles to cycle through
@@ -57,8 +135,14 @@ def main():
     ]
     sd_style_index = 0
 
+    # What is currently presented, to skip redrawing unchanged frames
+    shown_frame = None
+    shown_overlay = []
+
     # Show loading message
     def show_message(text):
+        nonlocal shown_frame
+        shown_frame = None  # force a full redraw afterwards
         screen.fill((0, 0, 0))
         msg = font.render(text, True, (255, 255, 255))
         rect = msg.get_rect(center=(config.DISPLAY_WIDTH // 2, config.DISPLAY_HEIGHT // 2))
@@ -67,7 +151,7 @@ def main():
 
     running = True
     while running:
-        frame_start = time.time()
+        frame_start = time.perf_counter()
 
         # Handle events
         for event in pygame.event.get():
@@ -99,15 +183,17 @@ def main():
                                 async_stylizer = AsyncStylizer()
                                 async_stylizer.start()
                                 sd_enabled = True
-                                sd_last_time = time.time()
+                                sd_last_time = time.perf_counter()
                                 sd_frame_count = 0
                             except Exception as e:
+                                # Retry from scratch on the next toggle
+                                async_stylizer = None
                                 print(f"Failed to load SD: {e}")
                                 show_message(f"SD load failed: {str(e)[:50]}")
                                 pygame.time.wait(2000)
                         else:
                             sd_enabled = True
-                            sd_last_time = time.time()
+                            sd_last_time = time.perf_counter()
                             sd_frame_count = 0
                 elif event.key == pygame.K_LEFTBRACKET:
                     # Previous style
@@ -145,9 +231,12 @@ def main():
                                 texture_stylizer = AsyncTextureStylizer()
                                 texture_stylizer.start()
                                 texture_mode = True
-                                tex_last_time = time.time()
+                                tex_last_time = time.perf_counter()
                                 tex_frame_count = 0
                             except Exception as e:
+                                # Retry from scratch on the next toggle
+                                texture_manager = None
+                                texture_stylizer = None
                                 print(f"Failed to initialize texture mode: {e}")
                                 import traceback
                                 traceback.print_exc()
@@ -155,7 +244,7 @@ def main():
                                 pygame.time.wait(2000)
                         else:
                             texture_mode = True
-                            tex_last_time = time.time()
+                            tex_last_time = time.perf_counter()
                             tex_frame_count = 0
 
         # Handle continuous key input
@@ -180,7 +269,7 @@ def main():
         # Handle texture mode - submit atlas for stylization
         if texture_mode and texture_stylizer is not None:
             # Throttle submissions to reduce contention (every 200ms)
-            now = time.time()
+            now = frame_start
             if now - tex_last_submit > 0.2:
                 tex_last_submit = now
                 _, prompt = sd_styles[sd_style_index]
@@ -197,90 +286,125 @@ def main():
             # Track texture mode FPS
             current_count = texture_stylizer.frames_processed
             if current_count > tex_frame_count:
-                now = time.time()
+                now = frame_start
                 if now - tex_last_time > 0.5:
                     tex_fps = (current_count - tex_frame_count) / (now - tex_last_time)
                     tex_frame_count = current_count
                     tex_last_time = now
 
         # Render frame from raycaster (pass texture_manager if in texture mode)
-        if texture_mode and texture_manager is not None:
-            raw_frame = cast_rays(player, game_map, texture_manager)
+        sd_view = sd_enabled and async_stylizer is not None and not texture_mode
+        if raycaster_worker is not None and not sd_view:
+            # Newest finished frame (usually last iteration's request)
+            view_textures = texture_manager if texture_mode else None
+            raycaster_worker.submit(player, view_textures)
+            raw_frame = raycaster_worker.get_latest()
+            if raw_frame is None:  # worker produced no first frame
+                raw_frame = cast_rays(player, game_map, view_textures, out=frame_buf)
+        elif texture_mode and texture_manager is not None:
+            raw_frame = cast_rays(player, game_map, texture_manager, out=frame_buf)
+        elif sd_view:
+            # Skip the raycast if the player hasn't moved and the raw frame is
+            # hidden behind a full SD blend (it only feeds the stylizer then)
+            player_state = (player.x, player.y, player.angle_bam)
+            if player_state != sd_raw_state or sd_blend < 1.0:
+                target = sd_raw_bufs[1] if sd_submitted is sd_raw_bufs[0] else sd_raw_bufs[0]
+                # Flat shading is enough when SD repaints every pixel
+                fast_mode = config.SD_FAST_RAYCAST and sd_blend >= 1.0
+                cast_rays(player, game_map, out=target, fast_mode=fast_mode)
+                sd_raw_frame = target
+                sd_raw_state = player_state
+            raw_frame = sd_raw_frame
         else:
-            raw_frame = cast_rays(player, game_map)
+            raw_frame = cast_rays(player, game_map, out=frame_buf)
 
         # SD processing (async) - only if not in texture mode
-        if sd_enabled and async_stylizer is not None and not texture_mode:
+        if sd_view:
             # Submit current frame for processing with current style prompt
             _, prompt = sd_styles[sd_style_index]
-            async_stylizer.submit_frame(raw_frame.copy(), prompt=prompt)
+            # (the stylizer works on (H, W, 3) images, raw_frame is column-major;
+            # it copies the transposed view on its own thread)
+            async_stylizer.submit_frame(raw_frame.swapaxes(0, 1), prompt=prompt)
+            sd_submitted = raw_frame
 
-            # Get latest stylized result
-            sd_frame = async_stylizer.get_latest(raw_frame)
+            # Get latest stylized result, viewed column-major to match raw_frame
+            sd_result = async_stylizer.get_latest(raw_frame.swapaxes(0, 1))
+            sd_frame = sd_result.swapaxes(0, 1)
 
             # Blend raw and SD frames based on sd_blend factor
+            scene_changed = True
             if sd_blend >= 1.0:
                 display_frame = sd_frame
+                # Only a new stylized frame changes what's on screen
+                scene_changed = sd_result is not shown_frame
+                shown_frame = sd_result
             elif sd_blend <= 0.0:
                 display_frame = raw_frame
+                shown_frame = None  # surface no longer shows a bare SD frame
             else:
-                display_frame = (
-                    raw_frame.astype(np.float32) * (1 - sd_blend) +
-                    sd_frame.astype(np.float32) * sd_blend
-                ).astype(np.uint8)
+                # Blend in preallocated float32 scratch, then write straight
+                # into the render surface's pixels (cast on assignment)
+                np.multiply(raw_frame, 1 - sd_blend, out=blend_buf, dtype=np.float32)
+                np.multiply(sd_frame, sd_blend, out=blend_tmp, dtype=np.float32)
+                np.add(blend_buf, blend_tmp, out=blend_buf)
+                frame_buf[...] = blend_buf
+                display_frame = frame_buf
+                shown_frame = None  # surface no longer shows a bare SD frame
 
             # Track SD FPS
             current_count = async_stylizer.frames_processed
             if current_count > sd_frame_count:
-                now = time.time()
+                now = frame_start
                 if now - sd_last_time > 0.5:  # Update every 0.5s
                     sd_fps = (current_count - sd_frame_count) / (now - sd_last_time)
                     sd_frame_count = current_count
                     sd_last_time = now
+        elif raw_frame is frame_buf:
+            # Rendered straight into the render surface this frame
+            display_frame = raw_frame
+            scene_changed = True
+            shown_frame = None
         else:
+            # Worker buffer: only a newly published one changes what's on
+            # screen (the worker never writes the buffer being shown)
             display_frame = raw_frame
-
-        # Convert numpy array to pygame surface
-        surface = pygame.surfarray.make_surface(display_frame.swapaxes(0, 1))
-
-        # Scale up to display size
-        scaled_surface = pygame.transform.scale(
-            surface,
-            (config.DISPLAY_WIDTH, config.DISPLAY_HEIGHT)
-        )
-
-        # Draw to screen
-        screen.blit(scaled_surface, (0, 0))
+            scene_changed = raw_frame is not shown_frame
+            shown_frame = raw_frame
 
         # Calculate display FPS
-        frame_time = time.time() - frame_start
-        display_fps = 1.0 / frame_time if frame_time > 0 else 0
+        frame_time = time.perf_counter() - frame_start
+        if frame_start - display_fps_last_time > 0.25:
+            display_fps = 1.0 / frame_time if frame_time > 0 else 0
+            display_fps_last_time = frame_start
+
+        # Collect UI overlay as (surface, position) pairs
+        overlay = []
 
-        # Draw FPS counter
-        fps_text = font.render(f"Display: {display_fps:.0f} FPS", True, (255, 255, 255))
-        screen.blit(fps_text, (10, 10))
+        # FPS counter
+        fps_text = display_fps_label.render(f"Display: {display_fps:.0f} FPS")
+        overlay.append((fps_text, (10, 10)))
 
         if sd_enabled and not texture_mode:
-            sd_fps_text = font.render(f"SD: {sd_fps:.1f} FPS", True, (0, 255, 0))
-            screen.blit(sd_fps_text, (10, 40))
+            sd_fps_text = sd_fps_label.render(f"SD: {sd_fps:.1f} FPS")
+            overlay.append((sd_fps_text, (10, 40)))
 
-            # Draw current style and blend
+            # Current style and blend
             style_name, _ = sd_styles[sd_style_index]
-            style_text = font.render(f"Style: {style_name}", True, (255, 200, 100))
-            screen.blit(style_text, (10, 70))
+            style_text = render_text(font, f"Style: {style_name}", (255, 200, 100))
+            overlay.append((style_text, (10, 70)))
 
-            blend_text = font.render(f"Blend: {int(sd_blend * 100)}%", True, (200, 200, 255))
-            screen.blit(blend_text, (10, 100))
+            blend_text = render_text(font, f"Blend: {int(sd_blend * 100)}%", (200, 200, 255))
+            overlay.append((blend_text, (10, 100)))
         elif texture_mode:
-            tex_fps_text = font.render(f"Tex: {tex_fps:.1f} FPS", True, (100, 200, 255))
-            screen.blit(tex_fps_text, (10, 40))
+            tex_fps_text = tex_fps_label.render(f"Tex: {tex_fps:.1f} FPS")
+            overlay.append((tex_fps_text, (10, 40)))
 
-            # Draw current style
+            # Current style
             style_name, _ = sd_styles[sd_style_index]
-            style_text = font.render(f"Style: {style_name}", True, (255, 200, 100))
-            screen.blit(style_text, (10, 70))
+            style_text = render_text(font, f"Style: {style_name}", (255, 200, 100))
+            overlay.append((style_text, (10, 70)))
 
-        # Draw mode status
+        # Mode status
         if texture_mode:
             mode_status = "TEX: ON [T off] | [ ] style | [SPACE view mode]"
             mode_color = (100, 200, 255)
@@ -298,16 +422,46 @@ def main():
             mode_color = (200, 200, 200)
             status_y = 105
 
-        mode_text = small_font.render(mode_status, True, mode_color)
-        screen.blit(mode_text, (10, status_y))
+        mode_text = render_text(small_font, mode_status, mode_color)
+        overlay.append((mode_text, (10, status_y)))
 
-        # Draw controls help
-        controls = small_font.render("WASD/Arrows: Move | ESC: Quit", True, (200, 200, 200))
-        screen.blit(controls, (10, config.DISPLAY_HEIGHT - 30))
+        # Controls help
+        overlay.append((controls_text, (10, config.DISPLAY_HEIGHT - 30)))
 
-        pygame.display.flip()
+        # Labels are cached surfaces, so an unchanged label is the same object
+        overlay_changed = len(overlay) != len(shown_overlay) or any(
+            surf is not shown_surf or pos != shown_pos
+            for (surf, pos), (shown_surf, shown_pos) in zip(overlay, shown_overlay)
+        )
+
+        if scene_changed or overlay_changed:
+            # Worker frames are their own surface's pixels and raw frames are
+            # already in the render surface; copy in anything else
+            source = render_surface
+            for buf, surf in zip(worker_buffers, worker_surfaces):
+                if display_frame is buf:
+                    source = surf
+            if (scene_changed and source is render_surface
+                    and not np.may_share_memory(display_frame, frame_buf)):
+                pygame.surfarray.blit_array(render_surface, display_frame)
+
+            # Scale up straight into the window surface (this also erases old labels)
+            pygame.transform.scale(source, display_size, screen)
+            for surf, pos in overlay:
+                screen.blit(surf, pos)
+
+            if scene_changed:
+                pygame.display.update(screen.get_rect())
+            else:
+                # Only labels changed: present just the old and new label areas
+                pygame.display.update(
+                    [surf.get_rect(topleft=pos) for surf, pos in shown_overlay + overlay]
+                )
+            shown_overlay = overlay
 
     # Cleanup
+    if raycaster_worker is not None:
+        raycaster_worker.stop()
     if async_stylizer is not None:
         async_stylizer.stop()
     if texture_stylizer is not None:
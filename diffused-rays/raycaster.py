@@ -1,13 +1,19 @@
 """Software raycaster using DDA algorithm with torch lighting."""
 
+import copy
 import math
+import threading
 import time
+import weakref
+from functools import lru_cache
+from queue import Queue, Empty
 from typing import Optional
 
 import numpy as np
 
 import config
 from game_state import Player, Map
+from raycaster_kernels import HAS_NUMBA, cast_columns, draw_textured_walls
 
 # Torch configuration
 TORCH_SPACING = 3  # Place torch every N wall units
@@ -18,223 +24,454 @@ TORCH_GLOW_COLOR = (255, 100, 20)  # Deeper orange glow
 TORCH_LIGHT_RADIUS = 4.0  # How far torch light reaches
 
 
-def get_flicker(t: float, seed: float = 0) -> float:
-    """Generate flickering intensity based on time and seed."""
+# Base wall color per cell value (undefined wall types get the default)
+_WALL_COLOR_TABLE = np.array(
+    [config.WALL_COLORS.get(i, config.DEFAULT_WALL_COLOR) for i in range(256)],
+    dtype=np.uint8,
+)
+_WARMTH = np.array([1.3, 0.9, 0.5])  # R, G, B multipliers for warm light
+_GLOW_RGB = np.array([255, 120, 40])  # Torch bloom color
+
+# Per-column ray angle offsets from the view direction, as cos/sin so each
+# frame only rotates them by the player angle
+_CAMERA_X = 2 * np.arange(config.RENDER_WIDTH) / config.RENDER_WIDTH - 1
+_RAY_OFFSET = _CAMERA_X * (config.FOV / 2)
+_RAY_OFFSET_COS = np.cos(_RAY_OFFSET)
+_RAY_OFFSET_SIN = np.sin(_RAY_OFFSET)
+
+# Lazy CuPy import, only needed when config.USE_GPU is set
+_cupy = None
+_gpu_grids = weakref.WeakKeyDictionary()  # Map -> device copy of its grid
+
+
+def _get_cupy():
+    """Import CuPy on first use."""
+    global _cupy
+    if _cupy is None:
+        import cupy
+        _cupy = cupy
+    return _cupy
+
+
+def get_flicker(t: float, seed):
+    """Generate flickering intensity based on time and seed (scalar or array)."""
     # Combine multiple sine waves for organic flicker
     flicker = (
-        math.sin(t * 8 + seed) * 0.1 +
-        math.sin(t * 13 + seed * 2) * 0.08 +
-        math.sin(t * 21 + seed * 3) * 0.05
+        np.sin(t * 8 + seed) * 0.1 +
+        np.sin(t * 13 + seed * 2) * 0.08 +
+        np.sin(t * 21 + seed * 3) * 0.05
     )
     return 0.85 + flicker  # Range roughly 0.6-1.0
 
 
-def has_torch(map_x: int, map_y: int, side: int) -> bool:
-    """Determine if a wall cell should have a torch."""
-    # Place torches on a grid pattern
-    if side == 0:  # N/S wall
-        return map_y % TORCH_SPACING == 1
-    else:  # E/W wall
-        return map_x % TORCH_SPACING == 1
+def ray_directions(angle: float):
+    """
+    Get the ray direction of every screen column for a view angle.
 
+    Uses the angle-addition identities on the precomputed column offsets,
+    so only one cos/sin pair is evaluated per frame.
 
-def cast_rays(player: Player, game_map: Map, texture_manager=None) -> np.ndarray:
+    Returns:
+        (ray_dir_x, ray_dir_y) arrays of shape (RENDER_WIDTH,).
+    """
+    cos_a = math.cos(angle)
+    sin_a = math.sin(angle)
+    ray_dir_x = cos_a * _RAY_OFFSET_COS - sin_a * _RAY_OFFSET_SIN
+    ray_dir_y = sin_a * _RAY_OFFSET_COS + cos_a * _RAY_OFFSET_SIN
+    return ray_dir_x, ray_dir_y
+
+
+@lru_cache(maxsize=None)
+def _glow_falloff(radius: int) -> np.ndarray:
+    """Radial glow falloff (1 - d/radius) on a (2r+1, 2r+1) grid, 0 at the center."""
+    offsets = np.arange(-radius, radius + 1)
+    d = np.sqrt(offsets[:, None] ** 2 + offsets[None, :] ** 2)
+    falloff = np.where((d <= radius) & (d > 0), 1 - d / radius, 0.0)
+    falloff.flags.writeable = False
+    return falloff
+
+
+def has_torch(map_x: np.ndarray, map_y: np.ndarray, side: np.ndarray) -> np.ndarray:
+    """Determine which hit wall cells should have a torch."""
+    # Place torches on a grid pattern: N/S walls by row, E/W walls by column
+    return np.where(side == 0, map_y % TORCH_SPACING == 1, map_x % TORCH_SPACING == 1)
+
+
+def _cast_columns_array(player: Player, grid, ray_dir_x, ray_dir_y, xp=np):
+    """
+    Batched array DDA for all columns.
+
+    Runs on NumPy (fallback when Numba is unavailable) or, with xp=cupy and
+    a device grid, on the GPU.
+
+    Args:
+        player: Player object with position and angle.
+        grid: Wall-padded grid (Map.padded) as an xp array.
+        ray_dir_x: Per-column ray direction x components (xp array).
+        ray_dir_y: Per-column ray direction y components (xp array).
+        xp: Array module, numpy or cupy.
+
+    Returns:
+        The same (W,) xp arrays as raycaster_kernels.cast_columns: map_x,
+        map_y, side, wall_type, perp_dist and wall_x.
+    """
+    width = len(ray_dir_x)
+
+    # Current map cell
+    map_x = xp.full(width, int(player.x))
+    map_y = xp.full(width, int(player.y))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        # Length of ray from one x/y side to next (inf for axis-aligned rays)
+        delta_dist_x = xp.abs(1 / ray_dir_x)
+        delta_dist_y = xp.abs(1 / ray_dir_y)
+
+        # Direction to step in x/y (+1 or -1)
+        step_x = xp.where(ray_dir_x < 0, -1, 1)
+        step_y = xp.where(ray_dir_y < 0, -1, 1)
+        side_dist_x = xp.where(
+            ray_dir_x < 0,
+            (player.x - map_x) * delta_dist_x,
+            (map_x + 1.0 - player.x) * delta_dist_x,
+        )
+        side_dist_y = xp.where(
+            ray_dir_y < 0,
+            (player.y - map_y) * delta_dist_y,
+            (map_y + 1.0 - player.y) * delta_dist_y,
+        )
+
+    # Batched DDA: step every ray that hasn't hit a wall yet
+    side = xp.zeros(width, dtype=xp.int64)
+    wall_type = xp.zeros(width, dtype=grid.dtype)
+    active = xp.arange(width)
+
+    while active.size:
+        step_in_x = side_dist_x[active] < side_dist_y[active]
+        ix = active[step_in_x]
+        iy = active[~step_in_x]
+
+        side_dist_x[ix] += delta_dist_x[ix]
+        map_x[ix] += step_x[ix]
+        side[ix] = 0
+
+        side_dist_y[iy] += delta_dist_y[iy]
+        map_y[iy] += step_y[iy]
+        side[iy] = 1
+
+        # The sentinel border stops every ray inside the padded grid
+        cells = grid[map_y[active] + 1, map_x[active] + 1]
+        wall_type[active] = cells
+        active = active[cells == 0]
+
+    # Calculate perpendicular distance and where on the wall we hit (0-1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        perp_dist_x = xp.where(
+            ray_dir_x != 0, (map_x - player.x + (1 - step_x) / 2) / ray_dir_x, config.MAX_DEPTH
+        )
+        perp_dist_y = xp.where(
+            ray_dir_y != 0, (map_y - player.y + (1 - step_y) / 2) / ray_dir_y, config.MAX_DEPTH
+        )
+    perp_dist = xp.where(side == 0, perp_dist_x, perp_dist_y)
+    wall_x = xp.where(side == 0, player.y + perp_dist * ray_dir_y, player.x + perp_dist * ray_dir_x)
+    wall_x -= xp.floor(wall_x)
+    perp_dist = xp.clip(perp_dist, 0.001, config.MAX_DEPTH)
+
+    return map_x, map_y, side, wall_type, perp_dist, wall_x
+
+
+def cast_rays(
+    player: Player,
+    game_map: Map,
+    texture_manager=None,
+    out: Optional[np.ndarray] = None,
+    fast_mode: bool = False,
+    current_time: Optional[float] = None,
+) -> np.ndarray:
     """
     Cast rays and render a frame with torch lighting.
 
+    The frame is column-major (indexed [x, y]) so each ray writes one
+    contiguous column, and the result matches pygame's surfarray layout.
+
     Args:
         player: Player object with position and angle.
         game_map: Map object with wall data.
         texture_manager: Optional TextureManager for per-pixel texture sampling.
+        out: Optional preallocated (RENDER_WIDTH, RENDER_HEIGHT, 3) uint8 buffer
+            to render into. Every pixel is overwritten.
+        fast_mode: Render flat colors only (no floor/ceiling gradient, distance
+            or side shading, or torch tint on walls), for frames that are only
+            fed to the SD stylizer.
+        current_time: Time (perf_counter seconds) driving torch flicker;
+            defaults to now. Lets a deferred render use its request time.
 
     Returns:
-        numpy array of shape (RENDER_HEIGHT, RENDER_WIDTH, 3) with RGB values.
+        numpy array of shape (RENDER_WIDTH, RENDER_HEIGHT, 3) with RGB values.
     """
     width = config.RENDER_WIDTH
     height = config.RENDER_HEIGHT
-    current_time = time.time()
+    if current_time is None:
+        current_time = time.perf_counter()
+
+    # Output buffer (ceiling/floor fill covers every pixel, no clear needed)
+    if out is None:
+        out = np.empty((width, height, 3), dtype=np.uint8)
+    frame = out
+
+    if fast_mode:
+        # Flat ceiling and floor
+        frame[:, :height // 2] = config.CEILING_COLOR
+        frame[:, height // 2:] = config.FLOOR_COLOR
+    else:
+        # Fill ceiling and floor with slight gradient, one color per row
+        half = height // 2
+        y = np.arange(height)
 
-    # Create output buffer
-    frame = np.zeros((height, width, 3), dtype=np.uint8)
-
-    # Fill ceiling and floor with slight gradient
-    for y in range(height // 2):
         # Ceiling gets slightly lighter toward horizon
-        ceil_factor = 0.7 + 0.3 * (y / (height // 2))
-        frame[y, :] = [int(c * ceil_factor) for c in config.CEILING_COLOR]
+        ceil_factor = 0.7 + 0.3 * (y[:half] / half)
+        frame[:, :half] = np.outer(ceil_factor, config.CEILING_COLOR).astype(np.uint8)
 
-    for y in range(height // 2, height):
         # Floor gets slightly lighter toward horizon
-        floor_factor = 0.7 + 0.3 * (1 - (y - height // 2) / (height // 2))
-        frame[y, :] = [int(c * floor_factor) for c in config.FLOOR_COLOR]
+        floor_factor = 0.7 + 0.3 * (1 - (y[half:] - half) / half)
+        frame[:, half:] = np.outer(floor_factor, config.FLOOR_COLOR).astype(np.uint8)
+
+    ray_dir_x, ray_dir_y = ray_directions(player.angle)
+
+    # Per-column DDA: on the GPU if enabled, else compiled kernel if
+    # available, else batched NumPy
+    if config.USE_GPU:
+        cupy = _get_cupy()
+        grid = _gpu_grids.get(game_map)
+        if grid is None:
+            grid = _gpu_grids[game_map] = cupy.asarray(game_map.padded)
+        map_x, map_y, side, wall_type, perp_dist, wall_x = (
+            cupy.asnumpy(a) for a in _cast_columns_array(
+                player, grid, cupy.asarray(ray_dir_x), cupy.asarray(ray_dir_y), xp=cupy
+            )
+        )
+    elif HAS_NUMBA:
+        map_x, map_y, side, wall_type, perp_dist, wall_x = cast_columns(
+            player.x, player.y, ray_dir_x, ray_dir_y, config.MAX_DEPTH,
+            game_map.flat, game_map.stride,
+        )
+    else:
+        map_x, map_y, side, wall_type, perp_dist, wall_x = _cast_columns_array(
+            player, game_map.padded, ray_dir_x, ray_dir_y
+        )
+
+    # Calculate wall height on screen
+    wall_height = (height / perp_dist).astype(np.int64)
+    draw_start = np.maximum(0, height // 2 - wall_height // 2)
+    draw_end = np.minimum(height - 1, height // 2 + wall_height // 2)
+
+    # Get wall color
+    base_color = _WALL_COLOR_TABLE[wall_type]
+
+    # Base distance shading
+    shade = np.maximum(0.15, 1.0 - perp_dist / config.MAX_DEPTH)
+    shade[side == 1] *= config.EW_SHADE_FACTOR
+
+    # Check for nearby torches and add warm light
+    torch_on_wall = has_torch(map_x, map_y, side)
+    torch_seed = map_x * 7 + map_y * 13  # Unique flicker per torch
+    flicker = get_flicker(current_time, torch_seed)
+
+    # Add torch glow to nearby walls
+    warm_light = np.where(
+        torch_on_wall & (perp_dist < TORCH_LIGHT_RADIUS),
+        (1 - perp_dist / TORCH_LIGHT_RADIUS) * flicker * 0.5,
+        0.0,
+    )
 
-    # Store torch info for glow pass
-    torch_columns = []
+    # Draw wall columns - either with textures or solid color
+    use_textures = texture_manager is not None and texture_manager.has_textures()
+    rows = np.arange(height)
+    wall_mask = (rows >= draw_start[:, None]) & (rows <= draw_end[:, None])
+
+    if fast_mode:
+        # Flat base color
+        np.copyto(frame, base_color[:, None, :], where=wall_mask[:, :, None])
+    elif use_textures and HAS_NUMBA:
+        # Compiled per-column texturing, straight into the frame
+        draw_textured_walls(
+            frame, texture_manager.tex_stack, wall_type, wall_x,
+            draw_start, draw_end, shade, warm_light, _WARMTH,
+        )
+    elif use_textures:
+        # Sample every wall pixel in one gather, lit with its column's shade
+        # and warmth
+        cols, ys = np.nonzero(wall_mask)
+        start = draw_start[cols]
+        # V coordinate (0 at top, 1 at bottom)
+        v = (ys - start) / np.maximum(1, draw_end - draw_start)[cols]
+        texels = texture_manager.sample_batch(wall_type[cols], wall_x[cols], v)
+        lit = texels * shade[cols, None] * (1 + warm_light[cols, None] * _WARMTH)
+        frame[cols, ys] = np.minimum(255, lit).astype(np.uint8)
+    else:
+        # Solid color (original behavior), with warm orange tint from torches
+        lit = base_color * shade[:, None] * (1 + warm_light[:, None] * _WARMTH)
+        color = np.minimum(255, lit).astype(np.uint8)
+        np.copyto(frame, color[:, None, :], where=wall_mask[:, :, None])
+
+    # Draw torches on walls where the ray hits the torch position
+    torch_center = 0.5
+    torch_hits = np.nonzero(
+        torch_on_wall &
+        (perp_dist < TORCH_LIGHT_RADIUS * 1.5) &
+        (np.abs(wall_x - torch_center) < TORCH_WIDTH)
+    )[0]
+
+    # Torch geometry for every hit column at once
+    torch_start = draw_start[torch_hits]
+    torch_span = draw_end[torch_hits] - torch_start
+    torch_y_center = torch_start + (torch_span * (1 - TORCH_HEIGHT)).astype(np.int64)
+    torch_h = np.maximum(3, (torch_span * 0.15).astype(np.int64))
+    torch_top = np.maximum(torch_start, torch_y_center - torch_h)
+    torch_bottom = np.minimum(draw_end[torch_hits], torch_y_center + torch_h // 2)
+    torch_flicker = flicker[torch_hits]
+    torch_dist = perp_dist[torch_hits]
+
+    for x, top, mid, bottom, flame_intensity in zip(
+        torch_hits.tolist(), torch_top.tolist(), torch_y_center.tolist(),
+        torch_bottom.tolist(), torch_flicker.tolist(),
+    ):
+        # Draw torch body (darker base); rows are within the wall slice
+        frame[x, mid:bottom + 1] = (80, 50, 30)  # Brown torch handle
+
+        # Draw flame with flicker, brighter toward top
+        flame_pos = 1 - (rows[top:mid + 1] - top) / max(1, mid - top)
+        flame = frame[x, top:mid + 1]
+        flame[:, 0] = np.minimum(255, TORCH_COLOR[0] * flame_intensity * (0.8 + 0.2 * flame_pos))
+        flame[:, 1] = np.minimum(255, TORCH_COLOR[1] * flame_intensity * flame_pos)
+        flame[:, 2] = np.minimum(255, TORCH_COLOR[2] * flame_intensity * flame_pos * 0.5)
+
+    # Add bloom/glow around torches, one radial stamp per torch
+    glow_radii = np.maximum(2, (8 / (torch_dist + 0.5)).astype(np.int64))
+    glow_intensities = torch_flicker * (1 - torch_dist / (TORCH_LIGHT_RADIUS * 1.5))
+
+    for tx, t_top, glow_radius, glow_intensity in zip(
+        torch_hits.tolist(), torch_top.tolist(), glow_radii.tolist(), glow_intensities.tolist(),
+    ):
+        # Clip the stamp to the frame
+        x0, x1 = max(0, tx - glow_radius), min(width, tx + glow_radius + 1)
+        y0, y1 = max(0, t_top - glow_radius), min(height, t_top + glow_radius + 1)
+        if x0 >= x1 or y0 >= y1:
+            continue
+        falloff = _glow_falloff(glow_radius)[
+            x0 - tx + glow_radius:x1 - tx + glow_radius,
+            y0 - t_top + glow_radius:y1 - t_top + glow_radius,
+        ] * glow_intensity * 0.3
+
+        current = frame[x0:x1, y0:y1].astype(float)
+        glow = _GLOW_RGB * falloff[:, :, None]
+        frame[x0:x1, y0:y1] = np.clip(current + glow, 0, 255).astype(np.uint8)
 
-    # Cast a ray for each column
-    for x in range(width):
-        # Calculate ray direction
-        camera_x = 2 * x / width - 1
-        ray_angle = player.angle + camera_x * (config.FOV / 2)
-        ray_dir_x = math.cos(ray_angle)
-        ray_dir_y = math.sin(ray_angle)
+    return frame
 
-        # Current map cell
-        map_x = int(player.x)
-        map_y = int(player.y)
 
-        # Length of ray from one x/y side to next
-        delta_dist_x = abs(1 / ray_dir_x) if ray_dir_x != 0 else float('inf')
-        delta_dist_y = abs(1 / ray_dir_y) if ray_dir_y != 0 else float('inf')
+class RaycasterWorker:
+    """
+    Background ray caster.
 
-        # Direction to step in x/y (+1 or -1)
-        if ray_dir_x < 0:
-            step_x = -1
-            side_dist_x = (player.x - map_x) * delta_dist_x
-        else:
-            step_x = 1
-            side_dist_x = (map_x + 1.0 - player.x) * delta_dist_x
-
-        if ray_dir_y < 0:
-            step_y = -1
-            side_dist_y = (player.y - map_y) * delta_dist_y
-        else:
-            step_y = 1
-            side_dist_y = (map_y + 1.0 - player.y) * delta_dist_y
-
-        # DDA loop
-        hit = False
-        side = 0
-        wall_type = 0
-
-        while not hit:
-            if side_dist_x < side_dist_y:
-                side_dist_x += delta_dist_x
-                map_x += step_x
-                side = 0
-            else:
-                side_dist_y += delta_dist_y
-                map_y += step_y
-                side = 1
-
-            wall_type = game_map.get_cell(map_x, map_y)
-            if wall_type != 0:
-                hit = True
-
-        # Calculate perpendicular distance
-        if side == 0:
-            perp_dist = (map_x - player.x + (1 - step_x) / 2) / ray_dir_x if ray_dir_x != 0 else config.MAX_DEPTH
-            # Calculate where on the wall we hit (0-1)
-            wall_x = player.y + perp_dist * ray_dir_y
-            wall_x -= math.floor(wall_x)
-        else:
-            perp_dist = (map_y - player.y + (1 - step_y) / 2) / ray_dir_y if ray_dir_y != 0 else config.MAX_DEPTH
-            wall_x = player.x + perp_dist * ray_dir_x
-            wall_x -= math.floor(wall_x)
-
-        perp_dist = max(0.001, min(perp_dist, config.MAX_DEPTH))
-
-        # Calculate wall height on screen
-        wall_height = int(height / perp_dist)
-        draw_start = max(0, height // 2 - wall_height // 2)
-        draw_end = min(height - 1, height // 2 + wall_height // 2)
-
-        # Get wall color
-        base_color = config.WALL_COLORS.get(wall_type, config.DEFAULT_WALL_COLOR)
-
-        # Base distance shading
-        shade = max(0.15, 1.0 - perp_dist / config.MAX_DEPTH)
-        if side == 1:
-            shade *= config.EW_SHADE_FACTOR
-
-        # Check for nearby torches and add warm light
-        torch_on_wall = has_torch(map_x, map_y, side)
-        torch_seed = map_x * 7 + map_y * 13  # Unique flicker per torch
-        flicker = get_flicker(current_time, torch_seed)
-
-        # Add torch glow to nearby walls
-        warm_light = 0.0
-        if torch_on_wall and perp_dist < TORCH_LIGHT_RADIUS:
-            light_intensity = (1 - perp_dist / TORCH_LIGHT_RADIUS) * flicker
-            warm_light = light_intensity * 0.5
-
-        # Draw wall column - either with textures or solid color
-        use_textures = texture_manager is not None and texture_manager.has_textures()
-
-        if use_textures:
-            # Per-pixel texture sampling
-            for y in range(draw_start, draw_end + 1):
-                # Calculate V coordinate (0 at top, 1 at bottom)
-                v = (y - draw_start) / max(1, draw_end - draw_start)
-                tex_color = texture_manager.sample(wall_type, wall_x, v)
-
-                # Apply lighting
-                color = []
-                for i, c in enumerate(tex_color):
-                    lit = c * shade
-                    if warm_light > 0:
-                        warmth = [1.3, 0.9, 0.5][i]
-                        lit = lit * (1 + warm_light * warmth)
-                    color.append(int(min(255, lit)))
-                frame[y, x] = color
-        else:
-            # Solid color (original behavior)
-            color = []
-            for i, c in enumerate(base_color):
-                lit = c * shade
-                # Add warm orange tint from torches
-                if warm_light > 0:
-                    warmth = [1.3, 0.9, 0.5][i]  # R, G, B multipliers for warm light
-                    lit = lit * (1 + warm_light * warmth)
-                color.append(int(min(255, lit)))
-
-            frame[draw_start:draw_end + 1, x] = color
-
-        # Draw torch on wall if present
-        if torch_on_wall and perp_dist < TORCH_LIGHT_RADIUS * 1.5:
-            # Check if we're at the torch position on the wall
-            torch_center = 0.5
-            if abs(wall_x - torch_center) < TORCH_WIDTH:
-                # Calculate torch vertical position
-                torch_y_center = draw_start + int((draw_end - draw_start) * (1 - TORCH_HEIGHT))
-                torch_h = max(3, int((draw_end - draw_start) * 0.15))
-
-                torch_top = max(draw_start, torch_y_center - torch_h)
-                torch_bottom = min(draw_end, torch_y_center + torch_h // 2)
-
-                # Draw torch body (darker base)
-                for y in range(torch_y_center, torch_bottom + 1):
-                    if 0 <= y < height:
-                        frame[y, x] = (80, 50, 30)  # Brown torch handle
-
-                # Draw flame with flicker
-                flame_intensity = flicker
-                for y in range(torch_top, torch_y_center + 1):
-                    if 0 <= y < height:
-                        # Flame gets brighter toward top
-                        flame_pos = 1 - (y - torch_top) / max(1, torch_y_center - torch_top)
-                        r = int(min(255, TORCH_COLOR[0] * flame_intensity * (0.8 + 0.2 * flame_pos)))
-                        g = int(min(255, TORCH_COLOR[1] * flame_intensity * flame_pos))
-                        b = int(min(255, TORCH_COLOR[2] * flame_intensity * flame_pos * 0.5))
-                        frame[y, x] = (r, g, b)
-
-                # Record torch for glow pass
-                torch_columns.append((x, torch_top, torch_y_center, perp_dist, flicker))
-
-    # Add bloom/glow around torches
-    for tx, t_top, t_mid, dist, flicker in torch_columns:
-        glow_radius = max(2, int(8 / (dist + 0.5)))
-        glow_intensity = flicker * (1 - dist / (TORCH_LIGHT_RADIUS * 1.5))
-
-        for dx in range(-glow_radius, glow_radius + 1):
-            for dy in range(-glow_radius, glow_radius + 1):
-                px, py = tx + dx, t_top + dy
-                if 0 <= px < width and 0 <= py < height:
-                    d = math.sqrt(dx * dx + dy * dy)
-                    if d <= glow_radius and d > 0:
-                        falloff = (1 - d / glow_radius) * glow_intensity * 0.3
-                        current = frame[py, px].astype(float)
-                        glow = np.array([255, 120, 40]) * falloff
-                        frame[py, px] = np.clip(current + glow, 0, 255).astype(np.uint8)
+    Renders frames for submitted player snapshots on its own thread, so ray
+    casting overlaps the main loop's scaling, UI and presenting (the Numba
+    kernels and most NumPy work run without the GIL). Like AsyncStylizer it
+    keeps only the newest request and the newest result.
+    """
 
-    return frame
+    def __init__(self, game_map: Map, buffers: Optional[list] = None):
+        """
+        Args:
+            game_map: Map to render.
+            buffers: Optional three (RENDER_WIDTH, RENDER_HEIGHT, 3) uint8
+                buffers to render into, e.g. pixel views of display surfaces.
+        """
+        self.game_map = game_map
+        self.input_queue: Queue = Queue(maxsize=1)
+        self.output_queue: Queue = Queue(maxsize=1)
+        self.running = False
+        self.thread: Optional[threading.Thread] = None
+
+        # Three frame buffers: one shown by the main loop, one published and
+        # one being rendered, so the worker never writes a frame in use
+        self.buffers = buffers if buffers is not None else [
+            np.empty((config.RENDER_WIDTH, config.RENDER_HEIGHT, 3), dtype=np.uint8)
+            for _ in range(3)
+        ]
+        self.published: Optional[np.ndarray] = None
+        self.shown: Optional[np.ndarray] = None
+
+    def start(self):
+        """Start the render thread."""
+        if self.running:
+            return
+
+        self.running = True
+        self.thread = threading.Thread(target=self._process_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop the render thread."""
+        self.running = False
+        if self.thread:
+            # Clear queue to unblock thread
+            try:
+                self.input_queue.get_nowait()
+            except Empty:
+                pass
+            self.thread.join(timeout=1.0)
+            self.thread = None
+
+    def _process_loop(self):
+        """Background thread that renders requested frames."""
+        while self.running:
+            try:
+                player, texture_manager, current_time = self.input_queue.get(timeout=0.1)
+            except Empty:
+                continue
+
+            try:
+                out = next(
+                    buf for buf in self.buffers
+                    if buf is not self.shown and buf is not self.published
+                )
+                cast_rays(player, self.game_map, texture_manager, out=out, current_time=current_time)
+
+                # Publish result (replace old if exists)
+                try:
+                    self.output_queue.get_nowait()
+                except Empty:
+                    pass
+                self.published = out
+                self.output_queue.put(out)
+
+            except Exception as e:
+                print(f"Raycaster worker error: {e}")
+                import traceback
+                traceback.print_exc()
+
+    def submit(self, player: Player, texture_manager=None):
+        """Request a frame for the player's current state. Non-blocking, drops old requests."""
+        try:
+            self.input_queue.get_nowait()
+        except Empty:
+            pass
+        # Snapshot player and time so the frame matches the moment of the request
+        self.input_queue.put_nowait((copy.copy(player), texture_manager, time.perf_counter()))
+
+    def get_latest(self) -> Optional[np.ndarray]:
+        """
+        Get the newest rendered frame, or the last one if nothing new is ready.
+
+        Blocks (up to a second) only until the very first frame exists, and
+        returns None if it doesn't arrive. The returned (W, H, 3) buffer stays
+        untouched until the next call.
+        """
+        try:
+            if self.shown is None:
+                self.shown = self.output_queue.get(timeout=1.0)
+            else:
+                self.shown = self.output_queue.get_nowait()
+        except Empty:
+            pass
+        return self.shown
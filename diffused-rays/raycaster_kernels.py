@@ -0,0 +1,185 @@
+"""Numba-compiled kernels for movement and ray casting.
+
+Numba is optional: without it the kernels run as plain Python (callers may
+prefer a NumPy path over the uncompiled per-column kernels, see HAS_NUMBA).
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that leaves the function as plain Python."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True)
+def _cell_is_wall(grid_flat, stride, x, y):
+    """Check if world position (x, y) is inside a wall (no bounds check, the
+    padded grid's sentinel border covers positions up to one cell outside)."""
+    return grid_flat[int(y + 1.0) * stride + int(x + 1.0)] != 0
+
+
+@njit(cache=True)
+def try_move_ok(grid_flat, stride, new_x, new_y, margin):
+    """
+    Check that position (new_x, new_y) and its corners at +/- margin are free.
+
+    Args:
+        grid_flat: Row-major flat wall-padded map grid (Map.flat).
+        stride: Padded row length (Map.stride).
+        new_x: Candidate x position.
+        new_y: Candidate y position.
+        margin: Distance to keep from walls.
+
+    Returns:
+        True if none of the five sample points is inside a wall.
+    """
+    return not (
+        _cell_is_wall(grid_flat, stride, new_x, new_y) or
+        _cell_is_wall(grid_flat, stride, new_x + margin, new_y + margin) or
+        _cell_is_wall(grid_flat, stride, new_x + margin, new_y - margin) or
+        _cell_is_wall(grid_flat, stride, new_x - margin, new_y + margin) or
+        _cell_is_wall(grid_flat, stride, new_x - margin, new_y - margin)
+    )
+
+
+@njit(cache=True, nogil=True, fastmath=True, boundscheck=False)
+def cast_columns(px, py, ray_dir_x_arr, ray_dir_y_arr, max_depth, grid_flat, stride):
+    """
+    Run the DDA for every screen column.
+
+    Serial on purpose: at a few hundred columns a parallel launch costs more
+    than it saves, and it keeps the kernel safe to call from the render
+    thread (TBB parallel regions started off the main thread can hang at exit).
+
+    Args:
+        px: Player x position.
+        py: Player y position.
+        ray_dir_x_arr: Per-column ray direction x components.
+        ray_dir_y_arr: Per-column ray direction y components.
+        max_depth: Maximum ray distance.
+        grid_flat: Row-major flat wall-padded map grid (Map.flat).
+        stride: Padded row length (Map.stride).
+
+    Returns:
+        Tuple of (W,) arrays: map_x, map_y, side, wall_type, perp_dist
+        (clamped to [0.001, max_depth]) and wall_x (hit position along the
+        wall, 0-1).
+    """
+    width = ray_dir_x_arr.shape[0]
+    map_x_out = np.empty(width, dtype=np.int64)
+    map_y_out = np.empty(width, dtype=np.int64)
+    side_out = np.empty(width, dtype=np.int64)
+    wall_type_out = np.empty(width, dtype=grid_flat.dtype)
+    perp_dist_out = np.empty(width, dtype=np.float64)
+    wall_x_out = np.empty(width, dtype=np.float64)
+
+    for x in range(width):
+        ray_dir_x = ray_dir_x_arr[x]
+        ray_dir_y = ray_dir_y_arr[x]
+
+        # Current map cell
+        map_x = int(px)
+        map_y = int(py)
+
+        # Length of ray from one x/y side to next (huge but finite when
+        # axis-aligned, fastmath assumes no infinities)
+        delta_dist_x = abs(1.0 / ray_dir_x) if ray_dir_x != 0 else 1e30
+        delta_dist_y = abs(1.0 / ray_dir_y) if ray_dir_y != 0 else 1e30
+
+        # Direction to step in x/y (+1 or -1)
+        if ray_dir_x < 0:
+            step_x = -1
+            side_dist_x = (px - map_x) * delta_dist_x
+        else:
+            step_x = 1
+            side_dist_x = (map_x + 1.0 - px) * delta_dist_x
+
+        if ray_dir_y < 0:
+            step_y = -1
+            side_dist_y = (py - map_y) * delta_dist_y
+        else:
+            step_y = 1
+            side_dist_y = (map_y + 1.0 - py) * delta_dist_y
+
+        # DDA loop (the sentinel border stops every ray inside the array)
+        side = 0
+        wall_type = 0
+        while wall_type == 0:
+            if side_dist_x < side_dist_y:
+                side_dist_x += delta_dist_x
+                map_x += step_x
+                side = 0
+            else:
+                side_dist_y += delta_dist_y
+                map_y += step_y
+                side = 1
+
+            wall_type = grid_flat[(map_y + 1) * stride + map_x + 1]
+
+        # Calculate perpendicular distance and where on the wall we hit
+        if side == 0:
+            perp_dist = (map_x - px + (1 - step_x) / 2) / ray_dir_x if ray_dir_x != 0 else max_depth
+            wall_x = py + perp_dist * ray_dir_y
+        else:
+            perp_dist = (map_y - py + (1 - step_y) / 2) / ray_dir_y if ray_dir_y != 0 else max_depth
+            wall_x = px + perp_dist * ray_dir_x
+
+        map_x_out[x] = map_x
+        map_y_out[x] = map_y
+        side_out[x] = side
+        wall_type_out[x] = wall_type
+        perp_dist_out[x] = max(0.001, min(perp_dist, max_depth))
+        wall_x_out[x] = wall_x - np.floor(wall_x)
+
+    return map_x_out, map_y_out, side_out, wall_type_out, perp_dist_out, wall_x_out
+
+
+@njit(cache=True, nogil=True, boundscheck=False)
+def draw_textured_walls(frame, tex_stack, wall_type, wall_x, draw_start, draw_end,
+                        shade, warm_light, warmth):
+    """
+    Texture and light every wall column directly into the frame.
+
+    Serial for the same reason as cast_columns. No fastmath, so the lighting
+    rounds exactly like the NumPy path.
+
+    Args:
+        frame: (W, H, 3) uint8 column-major frame to draw into.
+        tex_stack: (N, S, S, 3) uint8 textures indexed by wall type, S a power
+            of two; slot 0 is the fallback for unknown wall types.
+        wall_type: (W,) wall type hit by each column.
+        wall_x: (W,) texture U coordinate (0-1) of each hit.
+        draw_start: (W,) first wall row of each column.
+        draw_end: (W,) last wall row of each column (inclusive).
+        shade: (W,) distance/side shade of each column.
+        warm_light: (W,) torch warmth of each column.
+        warmth: (3,) per-channel warm light multipliers.
+    """
+    size = tex_stack.shape[1]
+    mask = size - 1
+    for x in range(frame.shape[0]):
+        wt = wall_type[x]
+        if wt >= tex_stack.shape[0]:
+            wt = 0
+        tx = int(wall_x[x] * (size - 1)) & mask
+        start = draw_start[x]
+        end = draw_end[x]
+        span = max(1, end - start)
+        col_shade = shade[x]
+        tint_r = 1.0 + warm_light[x] * warmth[0]
+        tint_g = 1.0 + warm_light[x] * warmth[1]
+        tint_b = 1.0 + warm_light[x] * warmth[2]
+        for y in range(start, end + 1):
+            # V coordinate (0 at top, 1 at bottom)
+            ty = int((y - start) / span * (size - 1)) & mask
+            frame[x, y, 0] = min(255.0, tex_stack[wt, ty, tx, 0] * col_shade * tint_r)
+            frame[x, y, 1] = min(255.0, tex_stack[wt, ty, tx, 1] * col_shade * tint_g)
+            frame[x, y, 2] = min(255.0, tex_stack[wt, ty, tx, 2] * col_shade * tint_b)
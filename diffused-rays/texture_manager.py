@@ -2,7 +2,7 @@
 
 import threading
 from queue import Queue, Empty
-from typing import Optional, Dict, Tuple
+from typing import Optional, Tuple
 
 import numpy as np
 
@@ -20,69 +20,62 @@ class TextureManager:
     TILE_SIZE = 64
     ATLAS_WIDTH = 256   # 4 tiles
     ATLAS_HEIGHT = 128  # 2 tiles
+    NUM_TYPES = 8       # wall types 1-8
 
     def __init__(self):
-        self.textures: Dict[int, np.ndarray] = {}  # wall_type -> 64x64x3 array
+        # All textures in one contiguous (NUM_TYPES + 1, 64, 64, 3) array indexed
+        # directly by wall_type (slot 0 is the solid fallback color), so
+        # sampling is a single gather
+        self.tex_stack: Optional[np.ndarray] = None
         self.base_atlas: Optional[np.ndarray] = None
 
-    def _get_tile_position(self, wall_type: int) -> Tuple[int, int]:
-        """Get (x, y) position of a wall type in the atlas."""
-        idx = wall_type - 1  # wall_type is 1-indexed
-        x = (idx % 4) * self.TILE_SIZE
-        y = (idx // 4) * self.TILE_SIZE
-        return x, y
-
-    def _generate_base_pattern(self, base_color: Tuple[int, int, int]) -> np.ndarray:
-        """Generate a base pattern tile with noise to give SD something to work with."""
-        tile = np.zeros((self.TILE_SIZE, self.TILE_SIZE, 3), dtype=np.uint8)
-
-        # Fill with base color
-        tile[:, :] = base_color
-
-        # Add noise/variation for texture
-        noise = np.random.randint(-30, 30, (self.TILE_SIZE, self.TILE_SIZE, 3))
-        tile = np.clip(tile.astype(np.int16) + noise, 0, 255).astype(np.uint8)
-
-        # Add some simple brick/stone pattern
-        for y in range(0, self.TILE_SIZE, 16):
-            # Horizontal lines
-            tile[y:y+2, :] = np.clip(tile[y:y+2].astype(np.int16) - 40, 0, 255).astype(np.uint8)
-
-        for x in range(0, self.TILE_SIZE, 32):
-            # Vertical lines (offset every other row)
-            for y in range(0, self.TILE_SIZE, 32):
-                offset = 16 if (y // 16) % 2 else 0
-                x_pos = (x + offset) % self.TILE_SIZE
-                tile[y:y+16, x_pos:x_pos+2] = np.clip(
-                    tile[y:y+16, x_pos:x_pos+2].astype(np.int16) - 40, 0, 255
-                ).astype(np.uint8)
-
-        return tile
-
     def create_base_atlas(self) -> np.ndarray:
         """Create the base atlas with patterns for all wall types."""
-        atlas = np.zeros((self.ATLAS_HEIGHT, self.ATLAS_WIDTH, 3), dtype=np.uint8)
-
-        for wall_type in range(1, 9):
-            x, y = self._get_tile_position(wall_type)
-            base_color = config.WALL_COLORS.get(wall_type, config.DEFAULT_WALL_COLOR)
-            atlas[y:y+self.TILE_SIZE, x:x+self.TILE_SIZE] = self._generate_base_pattern(base_color)
-
-        self.base_atlas = atlas
-        return atlas
+        # Per-pixel base color: one color per tile, laid out like the atlas
+        tile_colors = np.array([
+            config.WALL_COLORS.get(wall_type, config.DEFAULT_WALL_COLOR)
+            for wall_type in range(1, self.NUM_TYPES + 1)
+        ], dtype=np.int16).reshape(
+            self.ATLAS_HEIGHT // self.TILE_SIZE, self.ATLAS_WIDTH // self.TILE_SIZE, 3
+        )
+        atlas = tile_colors.repeat(self.TILE_SIZE, axis=0).repeat(self.TILE_SIZE, axis=1)
+
+        # Add noise/variation to give SD something to work with
+        atlas += np.random.randint(-30, 30, atlas.shape, dtype=np.int16)
+        np.clip(atlas, 0, 255, out=atlas)
+
+        # Simple brick/stone pattern: horizontal mortar every 16 rows, vertical
+        # mortar every 32 columns on alternate 16-row courses. The tile size is
+        # a multiple of the pattern period, so atlas coordinates work directly.
+        ys = np.arange(self.ATLAS_HEIGHT)[:, None]
+        xs = np.arange(self.ATLAS_WIDTH)[None, :]
+        h_lines = ys % 16 < 2
+        v_lines = (ys % 32 < 16) & (xs % 32 < 2)
+        atlas -= 40 * (h_lines.astype(np.int16) + v_lines)[:, :, None]
+        np.clip(atlas, 0, 255, out=atlas)
+
+        self.base_atlas = atlas.astype(np.uint8)
+        return self.base_atlas
 
     def split_atlas(self, styled_atlas: np.ndarray):
         """Split a styled atlas back into individual textures."""
-        # Handle size mismatch (SD might return different size)
+        # stylize_frame returns its input's size, so this is always the atlas size
         if styled_atlas.shape[:2] != (self.ATLAS_HEIGHT, self.ATLAS_WIDTH):
-            from PIL import Image
-            img = Image.fromarray(styled_atlas)
-            img = img.resize((self.ATLAS_WIDTH, self.ATLAS_HEIGHT), Image.Resampling.LANCZOS)
-            styled_atlas = np.array(img)
-
-        for wall_type in range(1, 9):
-            x, y = self._get_tile_position(wall_type)
-            self.textures[wall_type] = styled_atlas[y:y+self.TILE_SIZE, x:x+self.TILE_SIZE].copy()
+            raise ValueError(
+                f"Styled atlas is {styled_atlas.shape[1]}x{styled_atlas.shape[0]}, "
+                f"expected {self.ATLAS_WIDTH}x{self.ATLAS_HEIGHT}"
+            )
+
+        # (2*64, 4*64, 3) -> (8, 64, 64, 3), tiles in wall_type order
+        tiles = styled_atlas.reshape(
+            self.ATLAS_HEIGHT // self.TILE_SIZE, self.TILE_SIZE,
+            self.ATLAS_WIDTH // self.TILE_SIZE, self.TILE_SIZE, 3,
+        ).swapaxes(1, 2).reshape(-1, self.TILE_SIZE, self.TILE_SIZE, 3)
+
+        tex_stack = np.empty((self.NUM_TYPES + 1, self.TILE_SIZE, self.TILE_SIZE, 3), dtype=np.uint8)
+        tex_stack[0] = config.DEFAULT_WALL_COLOR
+        tex_stack[1:] = tiles
+        self.tex_stack = tex_stack
 
     def sample(self, wall_type: int, u: float, v: float) -> Tuple[int, int, int]:
         """
@@ -96,19 +89,39 @@ class TextureManager:
         Returns:
             RGB tuple
         """
-        tex = self.textures.get(wall_type)
-        if tex is None:
+        if self.tex_stack is None or not 1 <= wall_type <= self.NUM_TYPES:
             # Fallback to solid color
             return config.WALL_COLORS.get(wall_type, config.DEFAULT_WALL_COLOR)
 
         # Nearest neighbor sampling (fast)
         tx = int(u * (self.TILE_SIZE - 1)) % self.TILE_SIZE
         ty = int(v * (self.TILE_SIZE - 1)) % self.TILE_SIZE
-        return tuple(tex[ty, tx])
+        return tuple(self.tex_stack[wall_type, ty, tx])
+
+    def sample_batch(self, wall_types: np.ndarray, u: np.ndarray, v: np.ndarray) -> np.ndarray:
+        """
+        Sample many texels at once, e.g. every wall pixel of a frame.
+
+        Args:
+            wall_types: Array of wall types (1-8; others use the fallback color)
+            u: Array of horizontal coordinates (0-1)
+            v: Array of vertical coordinates (0-1)
+
+        Returns:
+            (len(u), 3) uint8 array of RGB values
+        """
+        # Unknown wall types read the solid fallback tile in slot 0
+        wall_types = np.where(wall_types <= self.NUM_TYPES, wall_types, 0)
+
+        # Nearest neighbor sampling, one gather; the tile size is a power of two
+        # so wrapping is a mask
+        tx = (u * (self.TILE_SIZE - 1)).astype(np.intp) & (self.TILE_SIZE - 1)
+        ty = (v * (self.TILE_SIZE - 1)).astype(np.intp) & (self.TILE_SIZE - 1)
+        return self.tex_stack[wall_types, ty, tx]
 
     def has_textures(self) -> bool:
         """Check if textures have been generated."""
-        return len(self.textures) > 0
+        return self.tex_stack is not None
 
 
 class AsyncTextureStylizer:
@@ -125,6 +138,8 @@ class AsyncTextureStylizer:
         self.running = False
         self.thread: Optional[threading.Thread] = None
         self.frames_processed = 0
+        # Exception raised by the worker's warm-up, re-raised from start()
+        self._warm_up_error: Optional[Exception] = None
 
     def start(self):
         """Start the background processing thread."""
@@ -132,12 +147,20 @@ class AsyncTextureStylizer:
             return
 
         # Pre-load the SD pipeline
-        from stylizer import load_pipeline
+        from stylizer import load_pipeline, WARM_UP_TIMEOUT
         load_pipeline()
 
         self.running = True
-        self.thread = threading.Thread(target=self._process_loop, daemon=True)
+        warmed = threading.Event()
+        self.thread = threading.Thread(target=self._process_loop, args=(warmed,), daemon=True)
         self.thread.start()
+        # Block (behind the loading message) until the worker has warmed up
+        if not warmed.wait(timeout=WARM_UP_TIMEOUT):
+            self.stop()
+            raise TimeoutError(f"SD warm-up took over {WARM_UP_TIMEOUT:.0f}s")
+        if self._warm_up_error is not None:
+            self.stop()
+            raise self._warm_up_error
 
     def stop(self):
         """Stop the background processing thread."""
@@ -150,11 +173,20 @@ class AsyncTextureStylizer:
             self.thread.join(timeout=1.0)
             self.thread = None
 
-    def _process_loop(self):
+    def _process_loop(self, warmed: threading.Event):
         """Background thread that stylizes texture atlases."""
-        from stylizer import stylize_frame
+        from stylizer import stylize_frame, warm_up
         import time
 
+        try:
+            warm_up()
+        except Exception as e:
+            # Hand the failure to start() instead of dying silently
+            self._warm_up_error = e
+            return
+        finally:
+            warmed.set()
+
         while self.running:
             try:
                 atlas, prompt = self.input_queue.get(timeout=0.1)
@@ -163,9 +195,9 @@ class AsyncTextureStylizer:
 
             try:
                 # Stylize the atlas
-                start = time.time()
+                start = time.perf_counter()
                 styled = stylize_frame(atlas, prompt=prompt)
-                elapsed = time.time() - start
+                elapsed = time.perf_counter() - start
                 print(f"Texture stylize took {elapsed:.2f}s")
 
                 # Validate output
@@ -187,13 +219,19 @@ class AsyncTextureStylizer:
                 traceback.print_exc()
 
     def submit(self, atlas: np.ndarray, prompt: str):
-        """Submit an atlas for stylization. Non-blocking, drops old pending."""
+        """
+        Submit an atlas for stylization. Non-blocking, drops old pending.
+
+        The atlas is queued without copying, so callers must not modify it in
+        place afterwards (TextureManager.base_atlas is built once and only
+        ever read).
+        """
         try:
             try:
                 self.input_queue.get_nowait()
             except Empty:
                 pass
-            self.input_queue.put_nowait((atlas.copy(), prompt))
+            self.input_queue.put_nowait((atlas, prompt))
         except:
             pass
 